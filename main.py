@@ -1,88 +1,309 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import platform
-from matplotlib import font_manager
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError: # pyarrow가 없으면 pandas C 엔진으로 대체 (Parquet 스냅샷도 사용 안 함)
+    pa = pacsv = pq = None
+import charset_normalizer
+import csv
+import codecs
+import io
+import functools
+import hashlib
+import os
+from pathlib import Path
 
 # --- 1. 폰트 객체 생성 함수 ---
-@st.cache_resource # 폰트 로드는 한 번만 수행하도록 캐싱
-def get_font():
+# 알려진 설치 경로 (Streamlit Cloud의 packages.txt 나눔고딕, macOS, Windows 순)
+FONT_CANDIDATES = (
+    '/usr/share/fonts/truetype/nanum/NanumGothic.ttf',
+    '/Library/Fonts/AppleGothic.ttf',
+    'C:/Windows/Fonts/malgun.ttf',
+)
+# matplotlib 폰트 목록에서 찾을 family 이름 (공백 제거·소문자, 우선순위 순)
+FONT_NAMES = ('nanumgothic', 'nanum', 'malgungothic', 'applegothic')
+
+@functools.lru_cache(None) # 무거운 matplotlib import는 실제로 필요할 때 한 번만
+def _get_plotting():
+    # pyplot(전역 Figure 관리·백엔드 선택)은 쓰지 않고 Figure를 직접 만들어 PNG로만 저장
+    import matplotlib as mpl
+    import matplotlib.figure
+    from matplotlib import font_manager
+    return mpl, font_manager
+
+def _find_nanum(f_list):
+    # Linux(Streamlit Cloud) 환경에서 나눔고딕 찾기
+    font_path = next((f for f in f_list if 'nanumgothic' in f.lower().replace(" ", "")), None)
+
+    # 못 찾을 경우 나눔 계열 아무거나 찾기
+    if not font_path:
+        font_path = next((f for f in f_list if 'nanum' in f.lower()), None)
+    return font_path
+
+@st.cache_resource # 폰트 탐색·등록은 한 번만 하고 해시 가능한 family 이름만 캐싱
+def _resolve_korean_font():
     try:
-        f_list = font_manager.findSystemFonts()
-        # Linux(Streamlit Cloud) 환경에서 나눔고딕 찾기
-        font_path = next((f for f in f_list if 'nanumgothic' in f.lower().replace(" ", "")), None)
-        
-        # 못 찾을 경우 나눔 계열 아무거나 찾기
+        _, font_manager = _get_plotting()
+        # 알려진 경로는 파일 존재 여부만 확인하고, 없으면 matplotlib이 이미 스캔해 둔
+        # 폰트 목록을, 폰트 캐시가 설치 전 것이라 못 찾을 때만 디스크를 다시 탐색
+        font_path = next((p for p in FONT_CANDIDATES if os.path.exists(p)), None)
         if not font_path:
-            font_path = next((f for f in f_list if 'nanum' in f.lower()), None)
-            
+            # 이미 등록·파싱된 FontEntry의 family 이름으로 매칭 (파일을 다시 열지 않음)
+            names = [e.name for e in font_manager.fontManager.ttflist]
+            for key in FONT_NAMES:
+                font_name = next((n for n in names if key in n.lower().replace(" ", "")), None)
+                if font_name:
+                    return font_name
+            font_path = _find_nanum(font_manager.findSystemFonts())
+
         if font_path:
-            return font_manager.FontProperties(fname=font_path)
+            font_manager.fontManager.addfont(font_path)
+            return font_manager.FontProperties(fname=font_path).get_name()
     except:
         pass
     return None
 
+def setup_korean_font():
+    # 전역 rcParams에 폰트 적용 (O(1) 대입이라 매번 해도 부담 없음)
+    mpl, _ = _get_plotting()
+    font_name = _resolve_korean_font()
+    if font_name:
+        mpl.rcParams['font.family'] = font_name
+    mpl.rcParams['axes.unicode_minus'] = False # 한글 폰트에서 마이너스 기호 깨짐 방지
+    return font_name
+
 # --- 2. 데이터 로드 (이전과 동일) ---
-@st.cache_data
+def _sniff_csv(file_path):
+    # 앞부분 64KB만 읽어 인코딩과 구분자를 한 번에 판별 (64KB는 인코딩 추정용)
+    with open(file_path, 'rb') as f:
+        sample = f.read(65536)
+    # 64KB 경계에서 잘린 마지막 줄(반쪽 멀티바이트 문자 포함)은 판별에서 제외
+    if len(sample) == 65536:
+        sample = sample[:sample.rfind(b'\n') + 1] or sample
+    # UTF-8 BOM이 있으면 바로 utf-8-sig, 없으면 UTF-8로 디코딩해 보고 실패할 때만 인코딩 추정
+    if sample.startswith(codecs.BOM_UTF8):
+        encoding = 'utf-8-sig'
+    else:
+        try:
+            sample.decode('utf-8')
+            encoding = 'utf-8'
+        except UnicodeDecodeError:
+            encoding = charset_normalizer.detect(sample)['encoding'] or 'cp1252'
+    # 구분자 판별은 헤더와 앞쪽 몇십 줄이면 충분 (Sniffer는 느려서 64KB 전체에 돌리면 파싱보다 오래 걸림)
+    head = sample[:8192]
+    if len(sample) > 8192:
+        head = head[:head.rfind(b'\n') + 1] or head
+    text = head.decode(encoding, errors='replace')
+    dialect = csv.Sniffer().sniff(text, delimiters=',;\t')
+    header = next(csv.reader(io.StringIO(text), dialect))
+    return encoding, dialect.delimiter, header
+
+def _to_int8(column, fill):
+    # 결측치를 제자리에서 채운 뒤 1바이트 정수로 (float32 임시 배열 하나만 사용)
+    values = column.to_numpy(dtype=np.float32, na_value=np.nan, copy=True)
+    np.copyto(values, fill, where=np.isnan(values))
+    return values.astype(np.int8)
+
+# Parquet 스냅샷이 가져야 할 컬럼과 dtype (예전 코드가 다른 스키마로 쓴 스냅샷은 다시 만듦)
+SNAPSHOT_DTYPES = {'Pclass': np.dtype(np.int8), 'Survived': np.dtype(np.int8), 'Age': np.dtype(np.float32)}
+
+def _file_signature(path):
+    # 경로 문자열만으로 키를 만들면 CSV가 바뀌어도 예전 결과가 남으므로 (수정 시각, 크기)를 함께 사용
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (path, None) # 파일이 없으면 load_data 안에서 처리되도록 해시 단계에서는 실패하지 않음
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+# 세션마다 복사/해시하지 않고 하나의 DataFrame을 공유
+@st.cache_resource(hash_funcs={str: _file_signature})
 def load_data(file_path):
+    csv_path = Path(file_path)
+    pq_path = csv_path.with_suffix('.parquet')
     try:
-        # 다양한 인코딩 시도 (가장 깔끔한 로직)
-        df = pd.read_csv(file_path, encoding='cp1252') 
-        df.columns = df.columns.str.replace('ï»¿', '', regex=False).str.strip().lower()
-        # 컬럼명 표준화
+        # 스냅샷에 기록된 CSV 서명(수정 시각, 크기)이 지금 CSV와 같으면 파싱 없이 바로 사용
+        # (수정 시각의 선후만 비교하면 더 오래된 CSV로 교체됐을 때 예전 스냅샷이 남음)
+        signature = repr(_file_signature(file_path)[1:]).encode()
+        if pq is not None and pq_path.exists():
+            try:
+                # 푸터의 메타데이터만 먼저 읽어 서명 확인
+                if pq.read_schema(pq_path).metadata.get(b'csv_signature') == signature:
+                    df = pd.read_parquet(pq_path)
+                    if df.dtypes.to_dict() == SNAPSHOT_DTYPES:
+                        return df
+            except:
+                pass # 깨졌거나 읽을 수 없는 스냅샷이면 CSV를 다시 파싱해 덮어쓰기
+
+        # 판별한 인코딩·구분자로 Arrow C++ 파서(없으면 pandas C 엔진)가 딱 한 번만 읽기
+        encoding, delimiter, header = _sniff_csv(file_path)
+        # 사용하는 3개 컬럼만 읽고(이름·티켓 등 문자열 컬럼은 토큰화 생략) 바로 표준 이름으로
         rename_dict = {'pclass': 'Pclass', 'survived': 'Survived', 'age': 'Age'}
-        df.rename(columns={k: v for k, v in rename_dict.items() if k in df.columns}, inplace=True)
-        df['Age'] = df['Age'].fillna(df['Age'].median())
-        df['Survived'] = df['Survived'].fillna(0).astype(int)
+        keys = {c: c.lstrip('\ufeff').strip().lower() for c in header}
+        columns = {c: rename_dict[k] for c, k in keys.items() if k in rename_dict}
+        # 파싱할 때부터 float32로 (64비트 중간 배열 없음). 결측이 있는 정수 컬럼은 pandas가 '1.0'처럼
+        # 저장하는데 Arrow의 정수 변환은 이를 거부하므로, 등급·생존 여부는 아래 _to_int8에서 int8로 좁힘
+        dtype = {c: 'float32' for c in columns}
+        if pacsv is not None:
+            convert = pacsv.ConvertOptions(include_columns=list(columns),
+                                           column_types={c: pa.float32() for c in columns})
+            # Arrow는 utf8만 직접 읽고(BOM도 스스로 건너뜀) 그 외 인코딩은 Python 코덱으로 변환하므로
+            # UTF-8 계열은 'utf8'로 넘겨야 메모리 맵에서 복사 없이 바로 파싱됨
+            arrow_encoding = 'utf8' if codecs.lookup(encoding).name in ('utf-8', 'utf-8-sig') else encoding
+            with pa.memory_map(file_path) as source:
+                tbl = pacsv.read_csv(source,
+                                     parse_options=pacsv.ParseOptions(delimiter=delimiter),
+                                     read_options=pacsv.ReadOptions(encoding=arrow_encoding),
+                                     convert_options=convert)
+            df = tbl.to_pandas(types_mapper=pd.ArrowDtype)
+        else:
+            df = pd.read_csv(file_path, encoding=encoding, sep=delimiter, engine='c',
+                             usecols=list(columns), dtype=dtype, memory_map=True)
+        df = df.rename(columns=columns)
+        # 결측치는 NumPy 마스크 쓰기 한 번으로 채우기
+        age = df['Age'].to_numpy(dtype=np.float32, na_value=np.nan, copy=True) # 제자리 채우기용 쓰기 가능 배열
+        np.copyto(age, np.nanmedian(age), where=np.isnan(age))
+        df['Age'] = age
+        df['Survived'] = _to_int8(df['Survived'], 0)
+        # 1~3 값뿐인 등급은 1바이트 정수로 (결측 등급은 0 → 등급 집계에서 제외)
+        df['Pclass'] = _to_int8(df['Pclass'], 0)
+        if pq is not None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            table = table.replace_schema_metadata({**table.schema.metadata, b'csv_signature': signature})
+            try:
+                pq.write_table(table, pq_path, compression='zstd')
+            except OSError:
+                pass # 쓰기 불가능한 환경이면 스냅샷 없이 진행
         return df
     except:
         return None
 
+# --- 3. 생존율 집계 함수 ---
+# 나이 구간 경계(right=False)와 이름. 경계는 Age 컬럼과 같은 float32
+AGE_BINS = np.array([0, 12, 18, 35, 60, 100], dtype=np.float32)
+AGE_LABELS = ('어린이', '청소년', '청년', '성인', '노년')
+
+def _fast_hash(df):
+    # 행 단위 해시(hash_pandas_object) 대신 모양·컬럼명·값 바이트를 blake2b로 한 번에 해시
+    h = hashlib.blake2b(repr((df.shape, list(df.columns))).encode())
+    for col in df.columns:
+        values = df[col].to_numpy()
+        # 문자열(object) 컬럼은 포인터가 아닌 실제 값으로 해시 (숫자 컬럼은 전체 바이트를 해시해도 수 µs)
+        h.update(values.tobytes() if values.dtype != object else '\0'.join(values).encode())
+    return h.digest()
+
+_FRAME_HASH = {pd.DataFrame: _fast_hash}
+
+@st.cache_resource # 재실행마다 새 디스패처를 만들지 않도록 컴파일·예열된 커널을 프로세스 단위로 보관
+def _get_aggregate_kernel():
+    from numba import njit
+
+    @njit(cache=True) # 컴파일 결과를 디스크에 저장해 프로세스 재시작 시에도 재사용
+    def _aggregate(ages, pclass, survived, bins):
+        # (등급, 나이 구간)별 [생존자 수, 전체 인원] 교차표를 루프 한 번으로 집계
+        n_groups = bins.size - 1
+        table = np.zeros((4, n_groups, 2), np.int32)
+        for i in range(ages.size):
+            # 구간이 5개뿐이라 선형 탐색 (right=False, 범위 밖 나이는 양 끝 구간으로)
+            k = 0
+            while k < n_groups - 1 and ages[i] >= bins[k + 1]:
+                k += 1
+            # numba는 인덱스 범위를 검사하지 않으므로 1~3 밖의 등급은 결측(0번 칸)으로
+            p = pclass[i]
+            if p < 0 or p > 3:
+                p = 0
+            table[p, k, 0] += survived[i]
+            table[p, k, 1] += 1
+        return table
+
+    # load_data가 만드는 dtype 그대로 한 번 호출해 컴파일(또는 디스크 캐시 로드)을 미리 끝냄
+    # (pandas가 to_numpy로 돌려주는 배열은 읽기 전용이라 같은 타입으로 맞춤)
+    columns = [np.zeros(1, np.float32), np.zeros(1, np.int8), np.zeros(1, np.int8)]
+    for arr in columns:
+        arr.flags.writeable = False
+    _aggregate(*columns, AGE_BINS)
+    return _aggregate
+
+def survival_rate(counts, key, names):
+    # [생존자 수, 전체 인원] 배열에서 인원이 있는 그룹만 골라 (그룹, 생존율) 표로
+    seen = counts[:, 1] > 0
+    return pd.DataFrame({key: np.asarray(names)[seen], 'Survived': counts[seen, 0] / counts[seen, 1]})
+
+@st.cache_data(hash_funcs=_FRAME_HASH) # 데이터가 같으면 재실행 시 집계를 건너뛰고 결과 표만 재사용
+def survival_tables(df, bins, labels):
+    # 등급×나이 그룹 교차표를 JIT 커널 한 번으로 만들고 각 축의 합으로 두 집계를 얻기
+    # (결측·범위 밖 등급은 0번 칸 → 등급 집계에서만 제외)
+    aggregate = _get_aggregate_kernel()
+    table = aggregate(df['Age'].to_numpy(), df['Pclass'].to_numpy(), df['Survived'].to_numpy(), bins)
+    pclass_survival = survival_rate(table.sum(axis=1)[1:], 'Pclass', np.arange(1, 4))
+    age_survival = survival_rate(table.sum(axis=0), 'AgeGroup', labels)
+    return pclass_survival, age_survival
+
+# --- 4. 그래프 생성 함수 ---
+# 집계 결과(몇 행짜리 작은 DataFrame)가 같으면 다시 그리지 않고 렌더링된 PNG를 재사용
+def _render_png(fig):
+    # st.pyplot 기본값(dpi=200)보다 픽셀 수를 크게 줄여 PNG 인코딩 비용 절감
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=72, bbox_inches='tight')
+    return buf.getvalue()
+
+@st.cache_resource(hash_funcs=_FRAME_HASH)
+def _plot_pclass(pclass_survival):
+    mpl, _ = _get_plotting()
+    fig = mpl.figure.Figure(figsize=(8, 5))
+    ax = fig.subplots()
+    # 이미 집계된 값이므로 seaborn(내부 재집계·부트스트랩 신뢰구간) 대신 막대만 그리기
+    n = len(pclass_survival)
+    ax.bar(range(n), pclass_survival['Survived'], color=mpl.colormaps['viridis'](np.linspace(0.15, 0.85, n)))
+    ax.set_xticks(range(n))
+    ax.set_xticklabels(pclass_survival['Pclass'])
+
+    # 한글 폰트는 rcParams['font.family']로 적용됨
+    if _resolve_korean_font():
+        ax.set_title('객실 등급별 생존율', fontsize=18)
+        ax.set_xlabel('객실 등급 (1, 2, 3등석)', fontsize=12)
+        ax.set_ylabel('생존율 (0.0 ~ 1.0)', fontsize=12)
+    return _render_png(fig)
+
+@st.cache_resource(hash_funcs=_FRAME_HASH)
+def _plot_age(age_survival):
+    mpl, _ = _get_plotting()
+    fig = mpl.figure.Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    n = len(age_survival)
+    ax.bar(range(n), age_survival['Survived'], color=mpl.colormaps['plasma'](np.linspace(0.15, 0.85, n)))
+    ax.set_xticks(range(n))
+    ax.set_xticklabels(age_survival['AgeGroup'])
+
+    # 한글 폰트(X축 눈금 포함)는 rcParams['font.family']로 적용됨
+    if _resolve_korean_font():
+        ax.set_title('나이 그룹별 생존율', fontsize=18)
+        ax.set_xlabel('나이 그룹', fontsize=12)
+        ax.set_ylabel('생존율', fontsize=12)
+    return _render_png(fig)
+
 # --- 메인 실행부 ---
 st.title("🚢 타이타닉 생존자 분석")
 st.markdown("---")
 
 data = load_data("titanic3.csv")
-font_prop = get_font()
 
 if data is not None:
-    if font_prop:
-        st.success(f"✅ 폰트 로드 완료: {font_prop.get_name()}")
+    # 데이터가 있을 때만 matplotlib을 불러와 폰트 설정
+    font_name = setup_korean_font()
+    if font_name:
+        st.success(f"✅ 폰트 로드 완료: {font_name}")
     else:
         st.error("❌ 폰트를 찾지 못했습니다. 'packages.txt'를 확인해 주세요.")
 
+    pclass_survival, age_survival = survival_tables(data, AGE_BINS, AGE_LABELS)
+
     # --- 1️⃣ 객실 등급별 생존율 ---
     st.header("1️⃣ 객실 등급(Pclass)별 생존율")
-    pclass_survival = data.groupby('Pclass')['Survived'].mean().reset_index()
-    
-    fig, ax = plt.subplots(figsize=(8, 5))
-    sns.barplot(x='Pclass', y='Survived', data=pclass_survival, palette='viridis', ax=ax)
-    
-    # ⭐ 폰트 직접 주입 (이 부분이 핵심)
-    if font_prop:
-        ax.set_title('객실 등급별 생존율', fontproperties=font_prop, fontsize=18)
-        ax.set_xlabel('객실 등급 (1, 2, 3등석)', fontproperties=font_prop, fontsize=12)
-        ax.set_ylabel('생존율 (0.0 ~ 1.0)', fontproperties=font_prop, fontsize=12)
-    st.pyplot(fig)
+    st.image(_plot_pclass(pclass_survival))
 
     # --- 2️⃣ 나이 그룹별 생존율 ---
     st.header("2️⃣ 나이 그룹별 생존율")
-    bins = [0, 12, 18, 35, 60, 100]
-    labels = ['어린이', '청소년', '청년', '성인', '노년']
-    data['AgeGroup'] = pd.cut(data['Age'], bins=bins, labels=labels, right=False)
-    age_survival = data.groupby('AgeGroup', observed=True)['Survived'].mean().reset_index()
-
-    fig, ax = plt.subplots(figsize=(10, 5))
-    sns.barplot(x='AgeGroup', y='Survived', data=age_survival, palette='plasma', ax=ax)
-    
-    # ⭐ 폰트 직접 주입
-    if font_prop:
-        ax.set_title('나이 그룹별 생존율', fontproperties=font_prop, fontsize=18)
-        ax.set_xlabel('나이 그룹', fontproperties=font_prop, fontsize=12)
-        ax.set_ylabel('생존율', fontproperties=font_prop, fontsize=12)
-        # X축 눈금(어린이, 청소년 등) 한글 처리
-        for label in ax.get_xticklabels():
-            label.set_fontproperties(font_prop)
-    st.pyplot(fig)
+    st.image(_plot_age(age_survival))